@@ -1,9 +1,11 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from configparser import RawConfigParser
 
 from pyspark.sql.utils import AnalysisException, IllegalArgumentException
 from pyspark.sql.window import Window
-from pyspark.sql.functions import col, lit, sum, count, row_number
+from pyspark.sql.functions import broadcast, col, countDistinct, expr, lit, sum, count, row_number, when
+from pyspark.sql.types import StructType, StructField, StringType, IntegerType, LongType
 from pyspark.sql import SparkSession
 
 
@@ -17,49 +19,191 @@ class CarCrashAnalysis(object):
     in Configurations/Configurations.conf
     """
 
+    # Columns referenced by the analyses for each input file; everything else is pruned at read time
+    CHARGES_COLUMNS = ["CRASH_ID", "CHARGES"]
+    DAMAGES_COLUMNS = ["CRASH_ID"]
+    ENDORSE_COLUMNS = ["CRASH_ID"]
+    PRIMARY_PERSON_COLUMNS = ["CRASH_ID", "DEATH_CNT", "PRSN_GNDR_ID", "PRSN_ETHNICITY_ID", "PRSN_ALC_RSLT_ID",
+                              "DRVR_ZIP", "DRVR_LIC_STATE_ID", "DRVR_LIC_CLS_ID"]
+    RESTRICT_COLUMNS = ["CRASH_ID"]
+    UNITS_COLUMNS = ["CRASH_ID", "VEH_MAKE_ID", "VEH_BODY_STYL_ID", "VEH_COLOR_ID", "VEH_DMAG_SCL_1_ID",
+                     "VEH_DMAG_SCL_2_ID", "FIN_RESP_TYPE_ID", "TOT_INJRY_CNT", "DEATH_CNT"]
+    INPUT_FILE_COLUMNS = {
+        "Charges_use.csv": CHARGES_COLUMNS,
+        "Damages_use.csv": DAMAGES_COLUMNS,
+        "Endorse_use.csv": ENDORSE_COLUMNS,
+        "Primary_Person_use.csv": PRIMARY_PERSON_COLUMNS,
+        "Restrict_use.csv": RESTRICT_COLUMNS,
+        "Units_use.csv": UNITS_COLUMNS,
+    }
+    # Lookup values used to filter the analyses, broadcast as small dataframes
+    DAMAGE_LEVELS = ['DAMAGED 4', 'DAMAGED 5', 'DAMAGED 6', 'DAMAGE 7 HIGHEST']
+    INVALID_LICENSE = ['NA', 'UNLICENSED', 'UNKNOWN']
+    INVALID_STATES = ['NA', 'Unknown']
+    # Columns typed at parse time instead of being read as strings
+    LONG_COLUMNS = {"CRASH_ID"}
+    INTEGER_COLUMN_SUFFIX = "_CNT"
+
     def __init__(self):
         self._config_reader = RawConfigParser()
         self._config_reader.read("Configuration.conf")
         self._input_file_path = self._config_reader.get("INPUT", "FILE_PATH")
         self._output_file_path = self._config_reader.get("OUTPUT", "FILE_PATH")
 
+        self._paths = {file_name: self._input_file_path.format(file_name=file_name)
+                       for file_name in self.INPUT_FILE_COLUMNS}
+
         self.spark_session = self.get_spark_session()
-        self.charges_use_df = self.get_dataframe_from_file_path(self._get_file_path("Charges_use.csv"))
-        self.damages_use_df = self.get_dataframe_from_file_path(self._get_file_path("Damages_use.csv"))
-        self.endorse_use_df = self.get_dataframe_from_file_path(self._get_file_path("Endorse_use.csv"))
-        self.primary_person_use_df = self.get_dataframe_from_file_path(self._get_file_path("Primary_Person_use.csv"))
-        self.restrict_use_df = self.get_dataframe_from_file_path(self._get_file_path("Restrict_use.csv"))
-        self.units_use_df = self.get_dataframe_from_file_path(self._get_file_path("Units_use.csv"))
-        self._output = ""
+        # Load the files in parallel so the Parquet conversion jobs of the different files run concurrently
+        with ThreadPoolExecutor(max_workers=len(self._paths)) as executor:
+            futures = {file_name: executor.submit(self.get_dataframe_from_file_path, path,
+                                                  self.INPUT_FILE_COLUMNS[file_name])
+                       for file_name, path in self._paths.items()}
+        dataframes = {file_name: future.result() for file_name, future in futures.items()}
+        self.charges_use_df = dataframes["Charges_use.csv"].cache()
+        self.damages_use_df = dataframes["Damages_use.csv"]
+        self.endorse_use_df = dataframes["Endorse_use.csv"]
+        self.primary_person_use_df = dataframes["Primary_Person_use.csv"].cache()
+        self.restrict_use_df = dataframes["Restrict_use.csv"]
+        self.units_use_df = dataframes["Units_use.csv"].cache()
+        self.damage_levels_df = self._get_lookup_dataframe(self.DAMAGE_LEVELS)
+        self.invalid_license_df = self._get_lookup_dataframe(self.INVALID_LICENSE)
+        self.invalid_states_df = self._get_lookup_dataframe(self.INVALID_STATES)
+        self._output_parts = []
 
     @staticmethod
     def get_spark_session():
-        spark_session = SparkSession.builder.enableHiveSupport().appName('myApp').getOrCreate()
+        # The dataset is small, so a couple of tasks per core is enough parallelism for every stage
+        parallelism = (os.cpu_count() or 1) * 2
+        spark_session = SparkSession.builder.enableHiveSupport().appName('myApp'). \
+            config("spark.scheduler.mode", "FAIR"). \
+            config("spark.sql.autoBroadcastJoinThreshold", 50 * 1024 * 1024). \
+            config("spark.sql.shuffle.partitions", parallelism). \
+            config("spark.default.parallelism", parallelism). \
+            config("spark.sql.adaptive.enabled", "true"). \
+            config("spark.sql.adaptive.coalescePartitions.enabled", "true"). \
+            config("spark.sql.adaptive.skewJoin.enabled", "true"). \
+            config("spark.sql.adaptive.localShuffleReader.enabled", "true"). \
+            config("spark.sql.adaptive.advisoryPartitionSizeInBytes", "64m"). \
+            config("spark.sql.inMemoryColumnarStorage.compressed", "true"). \
+            config("spark.sql.csv.filterPushdown.enabled", "true"). \
+            config("spark.sql.parquet.filterPushdown", "true"). \
+            config("spark.sql.parquet.enableVectorizedReader", "true"). \
+            config("spark.sql.execution.arrow.pyspark.enabled", "true"). \
+            config("spark.sql.optimizer.runtime.bloomFilter.enabled", "true"). \
+            config("spark.sql.optimizer.runtimeFilter.semiJoinReduction.enabled", "true"). \
+            getOrCreate()
         return spark_session
 
-    def _get_file_path(self, file_name):
-        return self._input_file_path.format(file_name=file_name)
+    def _get_schema(self, path):
+        """
+        Builds the schema of the file from its header line, so the data is read without any inference
+        :param path: path of the file
+        """
+        header = self.spark_session.read.csv(path=path, header=True).columns
+        return StructType([StructField(name, self._get_column_type(name), True) for name in header])
+
+    def _get_column_type(self, name):
+        """
+        Returns the type the column is parsed as: ids and counts are numeric, everything else is a string
+        :param name: name of the column
+        """
+        if name in self.LONG_COLUMNS:
+            return LongType()
+        if name.endswith(self.INTEGER_COLUMN_SUFFIX):
+            return IntegerType()
+        return StringType()
+
+    def _get_hadoop_path(self, path):
+        """
+        Returns the Hadoop file system and path for the given path, resolved the same way Spark resolves it
+        :param path: path of the file or directory
+        """
+        hadoop_path = self.spark_session._jvm.org.apache.hadoop.fs.Path(path)
+        return hadoop_path.getFileSystem(self.spark_session._jsc.hadoopConfiguration()), hadoop_path
+
+    def _is_complete_parquet(self, parquet_path):
+        """
+        Checks whether a Parquet copy was fully written, i.e. Spark left its _SUCCESS marker in it
+        :param parquet_path: path of the Parquet directory
+        """
+        file_system, hadoop_path = self._get_hadoop_path(parquet_path)
+        return file_system.exists(self.spark_session._jvm.org.apache.hadoop.fs.Path(hadoop_path, "_SUCCESS"))
+
+    def _ensure_parquet(self, csv_path):
+        """
+        Converts the CSV file to Parquet next to the CSV file, and returns the Parquet path.
+        The conversion is redone when an existing Parquet copy is incomplete or was written with a different schema
+        :param csv_path: path of the CSV file
+        """
+        parquet_path = os.path.splitext(csv_path)[0] + ".parquet"
+        schema = self._get_schema(csv_path)
+        if not self._is_complete_parquet(parquet_path) or \
+                self.spark_session.read.parquet(parquet_path).schema != schema:
+            print("Converting {csv} to Parquet at {parquet}".format(csv=csv_path, parquet=parquet_path))
+            # Write to a temporary path first, so an interrupted conversion never leaves a partial copy behind
+            tmp_parquet_path = parquet_path + ".tmp"
+            self.spark_session.read.option("header", True).schema(schema).csv(csv_path). \
+                write.mode("overwrite").parquet(tmp_parquet_path)
+            file_system, hadoop_path = self._get_hadoop_path(parquet_path)
+            file_system.delete(hadoop_path, True)
+            if not file_system.rename(self._get_hadoop_path(tmp_parquet_path)[1], hadoop_path):
+                raise IOError("Unable to move {tmp} to {parquet}".format(tmp=tmp_parquet_path, parquet=parquet_path))
+        return parquet_path
 
-    def get_dataframe_from_file_path(self, path):
-        df = self.spark_session.read.csv(path=path, header=True)
+    def get_dataframe_from_file_path(self, path, columns):
+        """
+        Reads the Parquet copy of the CSV file and keeps only the given columns,
+        so only those column chunks are read from disk
+        :param path: path of the CSV file
+        :param columns: columns referenced by the analyses
+        """
+        df = self.spark_session.read.parquet(self._ensure_parquet(path)).select(*columns)
         return df
 
+    def _get_lookup_dataframe(self, values):
+        """
+        Builds a single column dataframe holding the lookup values
+        :param values: values of the lookup
+        """
+        return self.spark_session.createDataFrame([(value,) for value in values], ["VALUE"])
+
+    @staticmethod
+    def _lookup_join(df, lookup_df, column, how):
+        """
+        Semi or anti joins the dataframe with the broadcast lookup dataframe on the given column
+        :param df: dataframe to filter
+        :param lookup_df: lookup dataframe built by _get_lookup_dataframe
+        :param column: column of df matched against the lookup values
+        :param how: "left_semi" to keep the matching rows, "left_anti" to drop them
+        """
+        return df.join(broadcast(lookup_df.toDF(column)), column, how)
+
+    @staticmethod
+    def _format_result(df, start=0):
+        """
+        Formats a multi-row result as a table, transferring it to the driver through Arrow
+        :param df: dataframe holding the result
+        :param start: index of the first row to keep
+        """
+        return df.toPandas().iloc[start:].to_string(index=False)
+
     def get_no_of_car_crashes_persons_killed_male(self):
         """
         Find the number of crashes (accidents) in which number of persons killed are male
         """
-        result = self.primary_person_use_df.filter((self.primary_person_use_df.DEATH_CNT > 0) & (
-                self.primary_person_use_df.PRSN_GNDR_ID == "MALE")).count()
-        self._output += "Number of crashes (accidents) in which number of persons killed are male: {res}\n".\
+        result = self.primary_person_use_df.agg(count(when(
+            (col("DEATH_CNT") > 0) & (col("PRSN_GNDR_ID") == "MALE"), True))).first()[0]
+        return "Number of crashes (accidents) in which number of persons killed are male: {res}\n".\
             format(res=result)
 
     def two_wheelers_booked_for_crashes(self):
         """
         How many two wheelers are booked for crashes
         """
-        result = self.units_use_df.filter((self.units_use_df.VEH_BODY_STYL_ID == "MOTORCYCLE") | (
-                self.units_use_df.VEH_BODY_STYL_ID == "POLICE MOTORCYCLE")).count()
-        self._output += "Number of two wheelers booked for crashes: {res}\n".format(res=result)
+        result = self.units_use_df.agg(count(when(
+            col("VEH_BODY_STYL_ID").isin("MOTORCYCLE", "POLICE MOTORCYCLE"), True))).first()[0]
+        return "Number of two wheelers booked for crashes: {res}\n".format(res=result)
 
     def state_with_highest_accidents_females(self):
         """
@@ -67,61 +211,61 @@ class CarCrashAnalysis(object):
         """
         result = self.primary_person_use_df.filter(self.primary_person_use_df.PRSN_GNDR_ID == "FEMALE"). \
             groupBy("DRVR_LIC_STATE_ID").agg(count("CRASH_ID").alias("CRASH_COUNT")). \
-            orderBy("CRASH_COUNT", ascending=False).select("DRVR_LIC_STATE_ID").limit(1).collect()[0]
-        self._output += "State that has highest number of accidents in which females are involved: {res}\n".format(
+            agg(expr("max_by(DRVR_LIC_STATE_ID, CRASH_COUNT)")).collect()[0][0]
+        return "State that has highest number of accidents in which females are involved: {res}\n".format(
             res=result)
 
     def top_5_to_15_vehicle_ids_largest_no_of_injuries(self):
         """
         Which are the Top 5th to 15th VEH_MAKE_IDs that contribute to a largest number of injuries including death
         """
-        df = self.units_use_df.withColumn("count",
-                                          self.units_use_df.TOT_INJRY_CNT + self.units_use_df.DEATH_CNT).orderBy(
-            "count", ascending=False).limit(15)
-        w = Window().orderBy(col("count").desc())
-        result = df.withColumn("row_num", row_number().over(w)).filter(col("row_num").between(5, 15)).select(
-            "VEH_MAKE_ID").collect()
-        self._output += "Top 5th to 15th VEH_MAKE_IDs that contribute to a largest number of injuries including " \
-                        "death: {res}\n".format(res=result)
+        result_df = self.units_use_df.withColumn("count", col("TOT_INJRY_CNT") + col("DEATH_CNT")).orderBy(
+            col("count").desc()).select("VEH_MAKE_ID").limit(15)
+        result = self._format_result(result_df, start=4)
+        return "Top 5th to 15th VEH_MAKE_IDs that contribute to a largest number of injuries including " \
+               "death:\n{res}\n".format(res=result)
 
     def top_ethnic_user_group_of_each_unique_body_style(self):
         """
         For all the body styles involved in crashes, mention the top ethnic user group of each unique body style
         """
-        # unable to find MAX ethnicity group count for each body style
-        result = self.units_use_df.join(self.primary_person_use_df,
-                               self.units_use_df.CRASH_ID == self.primary_person_use_df.CRASH_ID).groupBy(
-            "VEH_BODY_STYL_ID", "PRSN_ETHNICITY_ID").agg(count("PRSN_ETHNICITY_ID").alias("ethn_count")).collect()
-        self._output += "For all the body styles involved in crashes, the top ethnic user group of each unique body " \
-                        "style: {res}\n".format(res=result)
+        units_df = self.units_use_df.select("CRASH_ID", "VEH_BODY_STYL_ID")
+        persons_df = self.primary_person_use_df.select("CRASH_ID", "PRSN_ETHNICITY_ID")
+        w = Window.partitionBy("VEH_BODY_STYL_ID").orderBy(col("ethn_count").desc())
+        result_df = units_df.join(broadcast(persons_df), "CRASH_ID", "inner").groupBy(
+            "VEH_BODY_STYL_ID", "PRSN_ETHNICITY_ID").agg(count("PRSN_ETHNICITY_ID").alias("ethn_count")). \
+            withColumn("row_num", row_number().over(w)).filter(col("row_num") == 1). \
+            select("VEH_BODY_STYL_ID", "PRSN_ETHNICITY_ID")
+        result = self._format_result(result_df)
+        return "For all the body styles involved in crashes, the top ethnic user group of each unique body " \
+               "style:\n{res}\n".format(res=result)
 
     def top_5_zip_codes_with_highest_no_of_crashes_with_alcohol_factor(self):
         """
         Among the crashed cars, what are the Top 5 Zip Codes with highest number crashes with alcohols
         as the contributing factor to a crash (Use Driver Zip Code)
         """
-        result = self.primary_person_use_df.join(self.units_use_df, "CRASH_ID", "inner").where(
+        result_df = broadcast(self.primary_person_use_df).join(self.units_use_df, "CRASH_ID", "inner").where(
             ((col("VEH_BODY_STYL_ID") == "PASSENGER CAR, 4-DOOR") | (
                         col("VEH_BODY_STYL_ID") == "PASSENGER CAR, 2-DOOR"))
             & (col("PRSN_ALC_RSLT_ID") == "Positive")).groupBy(
             col("DRVR_ZIP")).agg(count("CRASH_ID").alias("CRASH_COUNT")).orderBy("CRASH_COUNT", ascending=False).\
-            select("DRVR_ZIP").limit(5).collect()
-        self._output += "Among the crashed cars, what are the Top 5 Zip Codes with highest number crashes with " \
-                        "alcohols as the contributing factor to a crash: {res}\n".format(res=result)
+            select("DRVR_ZIP").limit(5)
+        result = self._format_result(result_df)
+        return "Among the crashed cars, what are the Top 5 Zip Codes with highest number crashes with " \
+               "alcohols as the contributing factor to a crash:\n{res}\n".format(res=result)
 
     def count_distinct_crash_ids_with_damages(self):
         """
         Count of Distinct Crash IDs where No Damaged Property was observed
         and Damage Level (VEH_DMAG_SCL~) is above 4 and car avails Insurance
         """
-        damage_levels = {'DAMAGED 4', 'DAMAGED 5', 'DAMAGED 6', 'DAMAGE 7 HIGHEST'}
-        result = self.units_use_df.join(self.damages_use_df, "CRASH_ID", "left").filter(
-            self.damages_use_df.CRASH_ID.isNull &
-            (self.units_use_df.VEH_DMAG_SCL_1_ID.isin(damage_levels)) &
-            (self.units_use_df.VEH_DMAG_SCL_2_ID.isin(damage_levels)) &
-            (self.units_use_df.FIN_RESP_TYPE_ID != "NA")).select("CRASH_ID").distinct().collect()
-        self._output += "Count of Distinct Crash IDs where No Damaged Property was observed and Damage Level (" \
-                        "VEH_DMAG_SCL~) is above 4 and car avails Insurance: {res}\n".format(res=result)
+        units_df = self.units_use_df.join(broadcast(self.damages_use_df), "CRASH_ID", "left_anti")
+        units_df = self._lookup_join(units_df, self.damage_levels_df, "VEH_DMAG_SCL_1_ID", "left_semi")
+        units_df = self._lookup_join(units_df, self.damage_levels_df, "VEH_DMAG_SCL_2_ID", "left_semi")
+        result = units_df.filter(col("FIN_RESP_TYPE_ID") != "NA").agg(countDistinct("CRASH_ID")).first()[0]
+        return "Count of Distinct Crash IDs where No Damaged Property was observed and Damage Level (" \
+               "VEH_DMAG_SCL~) is above 4 and car avails Insurance: {res}\n".format(res=result)
 
     def determine_top_5_vehicle_makes(self):
         """
@@ -129,59 +273,71 @@ class CarCrashAnalysis(object):
         has licensed Drivers, uses top 10 used vehicle colours and has car licensed with the Top 25
         states with highest number of offences (to be deduced from the data)
         """
-        invalid_license = {'NA', 'UNLICENSED', 'UNKNOWN'}
-        invalid_states = {'NA', 'Unknown'}
-
         top_10_colors_df = self.units_use_df.groupBy("VEH_COLOR_ID").agg(
             count("CRASH_ID").alias("COLOR_COUNT")).orderBy(
             "COLOR_COUNT", ascending=False).limit(10).select("VEH_COLOR_ID")
-        top_10_colors = [row[0] for row in top_10_colors_df.collect()]
 
-        top_25_states_highest_offences_df = self.primary_person_use_df.groupBy("DRVR_LIC_STATE_ID"). \
+        # Anti joins keep null values, which the former ~isin() filters dropped
+        valid_states_df = self._lookup_join(self.primary_person_use_df.filter(col("DRVR_LIC_STATE_ID").isNotNull()),
+                                            self.invalid_states_df, "DRVR_LIC_STATE_ID", "left_anti")
+        top_25_states_highest_offences_df = valid_states_df.groupBy("DRVR_LIC_STATE_ID"). \
             agg(count("CRASH_ID").alias("CRASH_COUNT")). \
-            orderBy("CRASH_COUNT", ascending=False).filter(~col("DRVR_LIC_STATE_ID").isin(invalid_states)). \
-            limit(25).select("DRVR_LIC_STATE_ID")
-        top_25_states_highest_offences = [row[0] for row in top_25_states_highest_offences_df.collect()]
-
-        result = self.units_use_df.join(self.charges_use_df, "CRASH_ID", "inner").\
-            join(self.primary_person_use_df, "CRASH_ID", "inner").\
-            filter(self.charges_use_df.CHARGES.contains("SPEED") &
-                   ~self.primary_person_use_df.DRVR_LIC_CLS_ID.isin(invalid_license) &
-                   self.primary_person_use_df.DRVR_LIC_STATE_ID.isin(top_25_states_highest_offences) &
-                   self.units_use_df.VEH_COLOR_ID.isin(top_10_colors)). \
-            groupBy(self.units_use_df.VEH_MAKE_ID).agg(count("CRASH_ID").alias("CRASH_COUNT")). \
-            orderBy("CRASH_COUNT", ascending=False).select("VEH_MAKE_ID").limit(5).collect()
-
-        self._output += """Top 5 Vehicle Makes where drivers are charged with speeding related offences,
+            orderBy("CRASH_COUNT", ascending=False).limit(25).select("DRVR_LIC_STATE_ID")
+
+        speeding_charges_df = self.charges_use_df.filter(col("CHARGES").contains("SPEED")).select("CRASH_ID")
+        speeding_crash_ids_df = speeding_charges_df.distinct()
+        # Keep only the units of speeding crashes before joining, so the other joins see far fewer rows
+        units_df = self.units_use_df.select("CRASH_ID", "VEH_MAKE_ID", "VEH_COLOR_ID").\
+            join(broadcast(speeding_crash_ids_df), "CRASH_ID", "left_semi").\
+            join(broadcast(top_10_colors_df), "VEH_COLOR_ID", "left_semi")
+        persons_df = self.primary_person_use_df.select("CRASH_ID", "DRVR_LIC_CLS_ID", "DRVR_LIC_STATE_ID").\
+            filter(col("DRVR_LIC_CLS_ID").isNotNull()).\
+            join(broadcast(top_25_states_highest_offences_df), "DRVR_LIC_STATE_ID", "left_semi")
+        persons_df = self._lookup_join(persons_df, self.invalid_license_df, "DRVR_LIC_CLS_ID", "left_anti")
+        result_df = units_df.join(broadcast(speeding_charges_df), "CRASH_ID", "inner").\
+            join(broadcast(persons_df), "CRASH_ID", "inner").\
+            groupBy("VEH_MAKE_ID").agg(count("CRASH_ID").alias("CRASH_COUNT")). \
+            orderBy("CRASH_COUNT", ascending=False).select("VEH_MAKE_ID").limit(5)
+        result = self._format_result(result_df)
+
+        return """Top 5 Vehicle Makes where drivers are charged with speeding related offences,
         has licensed Drivers, uses top 10 used vehicle colours and has car licensed with the Top 25
-        states with highest number of offences: {res}\n""".format(res=result)
+        states with highest number of offences:\n{res}\n""".format(res=result)
 
     def write_to_file(self):
         """
         Method to write the output in the output file path
         """
         try:
-            self._remove_file_if_exists(self._output_file_path)
-            with open(self._output_file_path, "w") as file_writer:
-                file_writer.write(self._output)
+            # Opening in "w" mode truncates an existing file, so it does not need to be removed first
+            with open(self._output_file_path, "w", buffering=1 << 20) as file_writer:
+                file_writer.writelines(self._output_parts)
             print("Output is successfully saved at the path: {path}".format(path=self._output_file_path))
         except Exception as e:
             print("Error occurred while writing output to file: {msg}".format(msg=str(e)))
             raise
 
-    @staticmethod
-    def _remove_file_if_exists(path):
+    def _materialize_cached_dataframes(self):
         """
-        Removes the file at path if it already exists
-        :param path: path of the file
+        Triggers an action on each cached dataframe so that the analyses read from memory
         """
-        try:
-            if os.path.exists(path):
-                print("File already exists at path {path}. Removing the existing file...".format(path=path))
-                os.remove(path)
-                print("File deleted successfully!".format(path=path))
-        except Exception as e:
-            print("Error occurred while removing file if it exists: {msg}".format(msg=str(e)))
+        for df in (self.charges_use_df, self.primary_person_use_df, self.units_use_df):
+            df.count()
+
+    def _unpersist_cached_dataframes(self):
+        """
+        Releases the cached blocks of the dataframes reused across analyses
+        """
+        for df in (self.charges_use_df, self.primary_person_use_df, self.units_use_df):
+            df.unpersist()
+
+    def _run_in_own_pool(self, analysis):
+        """
+        Runs the analysis with the jobs of the current thread assigned to a scheduler pool named after it
+        :param analysis: analysis method to run
+        """
+        self.spark_session.sparkContext.setLocalProperty("spark.scheduler.pool", analysis.__name__)
+        return analysis()
 
     def execute_analysis(self):
         """
@@ -189,22 +345,30 @@ class CarCrashAnalysis(object):
         and writes output to file path provided in the configuration
         """
         try:
-            # Analysis 1
-            self.get_no_of_car_crashes_persons_killed_male()
-            # Analysis 2
-            self.two_wheelers_booked_for_crashes()
-            # Analysis 3
-            self.state_with_highest_accidents_females()
-            # Analysis 4
-            self.top_5_to_15_vehicle_ids_largest_no_of_injuries()
-            # Analysis 5
-            self.top_ethnic_user_group_of_each_unique_body_style()
-            # Analysis 6
-            self.top_5_zip_codes_with_highest_no_of_crashes_with_alcohol_factor()
-            # Analysis 7
-            self.count_distinct_crash_ids_with_damages()
-            # Analysis 8
-            self.determine_top_5_vehicle_makes()
+            self._materialize_cached_dataframes()
+            analyses = [
+                # Analysis 1
+                self.get_no_of_car_crashes_persons_killed_male,
+                # Analysis 2
+                self.two_wheelers_booked_for_crashes,
+                # Analysis 3
+                self.state_with_highest_accidents_females,
+                # Analysis 4
+                self.top_5_to_15_vehicle_ids_largest_no_of_injuries,
+                # Analysis 5
+                self.top_ethnic_user_group_of_each_unique_body_style,
+                # Analysis 6
+                self.top_5_zip_codes_with_highest_no_of_crashes_with_alcohol_factor,
+                # Analysis 7
+                self.count_distinct_crash_ids_with_damages,
+                # Analysis 8
+                self.determine_top_5_vehicle_makes,
+            ]
+            # Each analysis runs in its own thread and scheduler pool, so the FAIR scheduler shares the
+            # executors between their jobs instead of queueing them one after the other
+            with ThreadPoolExecutor(max_workers=len(analyses)) as executor:
+                futures = [executor.submit(self._run_in_own_pool, analysis) for analysis in analyses]
+                self._output_parts.extend(future.result() for future in futures)
             # Write output to file
             self.write_to_file()
 
@@ -219,6 +383,8 @@ class CarCrashAnalysis(object):
         except Exception as e:
             print(str(e))
             raise
+        finally:
+            self._unpersist_cached_dataframes()
 
 
 if __name__ == "__main__":